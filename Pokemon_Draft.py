@@ -1,12 +1,27 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 from io import BytesIO
-import re
 import requests
-import random
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import xlsxwriter
+import secrets
 import string
+import sys
 import copy
-from streamlit_autorefresh import st_autorefresh
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+import bisect
+import itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import html
 
 hide_streamlit_style = """
 <style>
@@ -21,96 +36,516 @@ st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
 st.set_page_config(page_title="Pokémon Auction Draft", layout="wide")
 
-# Auto-refresh every 2 seconds so host/viewers see updates from others
-st_autorefresh(interval=2000, key="auto_refresh")
-
 # ---------- Shared game store (persists across reruns & sessions) ----------
 
+GAMES_DB_PATH = Path.home() / ".cache" / "pokemon_draft" / "games.db"
+# Games untouched for this long are deleted
+GAME_MAX_AGE = 7 * 86400  # seconds
+# Bump when the pickled game dict changes shape; rows stored under any
+# other version are treated as missing instead of crashing the page
+GAME_SCHEMA_VERSION = 1
+
+
+class GameStore:
+    """
+    code -> game_state, kept in SQLite so games survive restarts and are
+    shared by every worker process on the host.
+    Each row carries a seq number; cas() only writes if nobody else has
+    saved the game since it was read (the caller then reloads and retries).
+    Games are pickled because they hold numpy arrays, a deque and a
+    bytearray, which JSON would not round-trip. Each row records the
+    GAME_SCHEMA_VERSION it was written with and when it was last saved;
+    rows older than GAME_MAX_AGE are pruned on open and on put().
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()  # one connection, many session threads
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS games ("
+                "code TEXT PRIMARY KEY, seq INTEGER NOT NULL, state BLOB NOT NULL, "
+                "schema INTEGER NOT NULL DEFAULT 0, "
+                "updated_at REAL NOT NULL DEFAULT 0)"
+            )
+            # Databases created before these columns existed: their rows
+            # get schema 0 (unreadable) and updated_at 0 (pruned below)
+            columns = {
+                row[1] for row in self._conn.execute("PRAGMA table_info(games)")
+            }
+            for column, decl in (
+                ("schema", "INTEGER NOT NULL DEFAULT 0"),
+                ("updated_at", "REAL NOT NULL DEFAULT 0"),
+            ):
+                if column not in columns:
+                    self._conn.execute(
+                        f"ALTER TABLE games ADD COLUMN {column} {decl}"
+                    )
+        self.prune()
+
+    def prune(self):
+        """Delete games not saved within GAME_MAX_AGE."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM games WHERE updated_at < ?",
+                (time.time() - GAME_MAX_AGE,),
+            )
+
+    def __contains__(self, code: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM games WHERE code = ?", (code,)
+            ).fetchone()
+        return row is not None
+
+    def seq(self, code: str):
+        """The game's current seq without loading it, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seq FROM games WHERE code = ?", (code,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def get(self, code: str):
+        """
+        A private copy of the game (with its current seq), or None if it
+        doesn't exist or was stored under another GAME_SCHEMA_VERSION.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seq, state FROM games WHERE code = ? AND schema = ?",
+                (code, GAME_SCHEMA_VERSION),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            game = pickle.loads(row[1])
+        except Exception:
+            return None
+        game["seq"] = row[0]
+        return game
+
+    def put(self, code: str, game: dict):
+        """
+        Insert or overwrite a game unconditionally (seq restarts at 0),
+        pruning stale games first.
+        """
+        self.prune()
+        game["seq"] = 0
+        state = pickle.dumps(game, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO games "
+                "(code, seq, state, schema, updated_at) VALUES (?, 0, ?, ?, ?)",
+                (code, state, GAME_SCHEMA_VERSION, time.time()),
+            )
+
+    def cas(self, code: str, expected_seq: int, game: dict) -> bool:
+        """Save game only if its stored seq is still expected_seq."""
+        state = pickle.dumps(game, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE games SET seq = seq + 1, state = ?, updated_at = ? "
+                "WHERE code = ? AND seq = ?",
+                (state, time.time(), code, expected_seq),
+            )
+        if cur.rowcount != 1:
+            return False
+        game["seq"] = expected_seq + 1
+        return True
+
+
 @st.cache_resource
-def get_game_store():
+def get_game_store() -> GameStore:
     """
-    Returns a shared dict: code -> game_state.
-    This persists across script reruns and is shared by all users
-    on the same Streamlit server.
+    Returns the shared GameStore.
+    Cached as a resource so each server process opens the database once.
     """
-    return {}  # we will mutate this, NOT reassign
+    return GameStore(GAMES_DB_PATH)
 
 
 # ---------- Pokémon helpers ----------
 
+# Characters dropped from slugs ("mr. mime" -> "mr-mime", "farfetch'd")
+SLUG_DELETE = str.maketrans("", "", ".'")
+
+
 def pokemon_slug(name: str) -> str:
     """Fallback slug function if ID lookup fails."""
     slug = name.strip().lower()
     slug = slug.replace("♀", "-f").replace("♂", "-m")
-    slug = re.sub(r"[.']", "", slug)
-    slug = re.sub(r"\s+", "-", slug)
-    return slug
+    slug = slug.translate(SLUG_DELETE)
+    return "-".join(slug.split())
 
 
-@st.cache_data(show_spinner=False)
-def fetch_pokemon_from_api():
+@st.cache_resource
+def get_http_session() -> requests.Session:
     """
-    Fetch Pokémon names + numeric IDs from PokeAPI.
-    Returns (names_list, name_to_id_dict).
+    Shared HTTP session so outbound calls reuse pooled connections, with
+    a few backed-off retries for transient failures.
+    Cached as a resource because the script itself re-runs on every rerun.
     """
-    url = "https://pokeapi.co/api/v2/pokemon?limit=2000"
-    try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as e:
-        st.warning(
-            "Couldn't load Pokémon names from PokeAPI. "
-            f"Reason: {e}. Autocomplete will be disabled."
-        )
-        return [], {}
+    session = requests.Session()
+    # requests already asks for gzip; name the app so PokeAPI and GitHub
+    # can tell this client apart from generic python-requests traffic
+    session.headers["User-Agent"] = "pokemon-auction-draft/1.0"
+    session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=16,
+            # Room for every prefetch worker plus the sessions' own
+            # fetches, so nobody opens (and drops) an unpooled connection
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3),
+        ),
+    )
+    return session
+
 
-    results = data.get("results", [])
+def parse_pokeapi_results(results: list):
+    """
+    Turn PokeAPI's [{"name", "url"}, ...] listing into
+    (sorted names_tuple, name_to_id_dict, name_to_sprite_url_dict).
+    Malformed entries (not an object, no string name/url, or no numeric
+    id in the URL) are skipped.
+    """
     names = []
     name_to_id = {}
+    name_to_url = {}
 
     for entry in results:
-        n = entry.get("name", "").strip()
-        url = entry.get("url", "").strip()
+        if not isinstance(entry, dict):
+            continue
+        n = entry.get("name")
+        url = entry.get("url")
+        if not isinstance(n, str) or not isinstance(url, str):
+            continue
+        n = n.strip()
+        url = url.strip()
         if not n or not url:
             continue
 
         # URL looks like .../pokemon/25/
         try:
-            poke_id = int(url.rstrip("/").split("/")[-1])
+            poke_id = int(url.rstrip("/").rpartition("/")[2])
         except ValueError:
             continue
 
+        # PokeAPI names are already lowercase, so interning makes the name
+        # and both dict keys one shared object instead of three strings.
+        n = sys.intern(n)
+        key = sys.intern(n.lower())
         names.append(n)
-        name_to_id[n.lower()] = poke_id
+        name_to_id[key] = poke_id
+        # PokeAPI sprite set (safe for programmatic use)
+        name_to_url[key] = (
+            "https://raw.githubusercontent.com/PokeAPI/sprites/master/"
+            f"sprites/pokemon/{poke_id}.png"
+        )
+
+    # Sorted once at fetch time so the nomination selectbox never re-sorts
+    names.sort()
+    return tuple(names), name_to_id, name_to_url
+
+
+# On-disk copy of the PokeAPI listing so restarts don't hit the network
+POKEAPI_CACHE_FILE = Path.home() / ".cache" / "pokemon_draft" / "pokeapi_index.json"
+POKEAPI_CACHE_TTL = 7 * 86400  # seconds
+
+
+def read_pokeapi_disk_cache(max_age=None):
+    """
+    Cached PokeAPI results list, or None if missing/unreadable, not a
+    list, or older than max_age seconds (max_age=None accepts any age).
+    """
+    try:
+        if max_age is not None:
+            age = time.time() - POKEAPI_CACHE_FILE.stat().st_mtime
+            if age > max_age:
+                return None
+        results = orjson.loads(POKEAPI_CACHE_FILE.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    return results if isinstance(results, list) else None
+
+
+def write_pokeapi_disk_cache(results: list):
+    """Best-effort atomic write (temp file + rename) of the results list."""
+    tmp_path = None
+    try:
+        POKEAPI_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=POKEAPI_CACHE_FILE.parent, suffix=".tmp"
+        )
+        with os.fdopen(fd, "wb") as f:
+            f.write(orjson.dumps(results))
+        os.replace(tmp_path, POKEAPI_CACHE_FILE)
+    except OSError:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def load_pokemon_index(session: requests.Session):
+    """
+    Fetch Pokémon names + numeric IDs from PokeAPI (the disk copy is used
+    while younger than POKEAPI_CACHE_TTL).
+    Returns (names_tuple, name_to_id_dict, name_to_sprite_url_dict, warning),
+    where warning is None on success. Runs off the script thread, so it
+    takes the HTTP session as an argument and leaves showing the warning
+    to the caller.
+    """
+    results = read_pokeapi_disk_cache(POKEAPI_CACHE_TTL)
+
+    if results is None:
+        url = "https://pokeapi.co/api/v2/pokemon?limit=2000"
+        try:
+            resp = session.get(url, timeout=10)
+            resp.raise_for_status()
+            results = orjson.loads(resp.content).get("results", [])
+            if not isinstance(results, list):
+                raise ValueError("unexpected PokeAPI response shape")
+        except Exception as e:
+            # A stale copy on disk beats disabling autocomplete
+            results = read_pokeapi_disk_cache()
+            if results is None:
+                return (), {}, {}, (
+                    "Couldn't load Pokémon names from PokeAPI. "
+                    f"Reason: {e}. Autocomplete will be disabled."
+                )
+        else:
+            if results:
+                write_pokeapi_disk_cache(results)
+
+    # The result is cached (with the future) for a day, so nothing may
+    # escape as an exception: it would be re-raised on every page run
+    try:
+        names, name_to_id, name_to_url = parse_pokeapi_results(results)
+    except Exception as e:
+        return (), {}, {}, (
+            "Couldn't read the Pokémon list. "
+            f"Reason: {e}. Autocomplete will be disabled."
+        )
 
     if not names:
-        st.warning(
+        return names, name_to_id, name_to_url, (
             "PokeAPI returned no Pokémon names. "
             "Autocomplete will be disabled."
         )
 
-    return names, name_to_id
+    return names, name_to_id, name_to_url, None
+
+
+@st.cache_resource(ttl=86400, show_spinner=False)
+def get_pokemon_index_future() -> Future:
+    """
+    Start loading the Pokémon index in the background (refreshed daily),
+    so a cold start renders the landing page without waiting on PokeAPI.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pokeapi")
+    future = executor.submit(load_pokemon_index, get_http_session())
+    executor.shutdown(wait=False)  # its thread exits after the one load
+    return future
+
+
+def pokemon_index(wait: bool = False):
+    """
+    (names_tuple, name_to_id_dict, name_to_sprite_url_dict) once the
+    background load has finished; empty until then unless wait=True.
+    """
+    future = get_pokemon_index_future()
+    if not (wait or future.done()):
+        return (), {}, {}
+    return future.result()[:3]
+
 
+def pokemon_index_warning():
+    """The background load's warning text, or None (also while loading)."""
+    future = get_pokemon_index_future()
+    return future.result()[3] if future.done() else None
 
-POKEMON_POOL, POKEMON_ID_MAP = fetch_pokemon_from_api()
+
+# Shown once per run, here, rather than by every pokemon_index() caller
+index_warning = pokemon_index_warning()
+if index_warning:
+    st.warning(index_warning)
+
+
+@st.cache_resource
+def get_sprite_url_memo() -> dict:
+    """
+    Raw name -> resolved sprite URL, shared across reruns and sessions.
+    (A module-level lru_cache would be rebuilt on every rerun.)
+    """
+    return {}
 
 
 def pokemon_image_url(name: str) -> str:
     """
-    Primary: use PokeAPI numeric ID -> GitHub sprites.
+    Primary: sprite URL precomputed from the PokeAPI numeric ID.
     Fallback: try Pokemondb slug (for any weird manual entries).
+    Memoized on the raw name, so repeat renders are a single dict hit.
     """
-    name_key = name.strip().lower()
-    poke_id = POKEMON_ID_MAP.get(name_key)
+    memo = get_sprite_url_memo()
+    url = memo.get(name)
+    if url:
+        return url
+
+    name_to_url = pokemon_index()[2]
+    url = name_to_url.get(name.strip().lower())
+    if not url:
+        # Fallback: slug-based URL (may or may not work)
+        slug = pokemon_slug(name)
+        url = f"https://img.pokemondb.net/sprites/home/normal/{slug}.png"
+
+    # Until the index has loaded every name falls back; don't pin those
+    if name_to_url:
+        memo[name] = url
+    return url
 
-    if poke_id:
-        # PokeAPI sprite set (safe for programmatic use)
-        return f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{poke_id}.png"
 
-    # Fallback: slug-based URL (may or may not work)
-    slug = pokemon_slug(name)
-    return f"https://img.pokemondb.net/sprites/home/normal/{slug}.png"
+# Sprites kept in memory, and how long a failed download is remembered
+# before the URL may be tried again
+SPRITE_CACHE_MAX = 2048
+SPRITE_RETRY_SECONDS = 300
+
+
+class SpriteCache:
+    """
+    Sprite URL -> downloaded bytes, bounded to max_entries (oldest
+    evicted first). Written by the prefetch pool and read by renders, so
+    every access takes a lock.
+    Entries are (data, time): data is None while a download is queued
+    and b"" after a failed one, which is only retried after retry_after
+    seconds so a dead URL isn't hit on every rerun.
+    """
+
+    def __init__(self, max_entries: int, retry_after: float):
+        self.max_entries = max_entries
+        self.retry_after = retry_after
+        self._entries = {}  # insertion-ordered: oldest first
+        self._lock = threading.Lock()
+
+    def get(self, url: str):
+        """Cached bytes, b"" for a failed download, None if not (yet) fetched."""
+        with self._lock:
+            entry = self._entries.get(url)
+        return None if entry is None else entry[0]
+
+    def claim(self, url: str) -> bool:
+        """
+        Mark url as queued and return True if it needs a download: not
+        cached, not already queued, and not a failure younger than
+        retry_after.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                data, at = entry
+                if data is None or data or now - at < self.retry_after:
+                    return False
+            self._entries[url] = (None, now)
+            return True
+
+    def store(self, url: str, data: bytes):
+        """Record a finished download as the newest entry, evicting the oldest."""
+        with self._lock:
+            self._entries.pop(url, None)
+            self._entries[url] = (data, time.monotonic())
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+
+@st.cache_resource
+def get_sprite_bytes_cache() -> SpriteCache:
+    """The shared sprite cache, one per server process."""
+    return SpriteCache(SPRITE_CACHE_MAX, SPRITE_RETRY_SECONDS)
+
+
+def download_sprite(url: str, cache: SpriteCache, session: requests.Session):
+    """
+    Fetch one sprite into cache. Runs on the prefetch pool, so it takes
+    the cache and HTTP session as arguments instead of calling st.*.
+    """
+    try:
+        resp = session.get(url, timeout=5)
+        resp.raise_for_status()
+    except Exception:
+        cache.store(url, b"")
+    else:
+        cache.store(url, resp.content)
+
+
+# How many sprites to warm in the background when a game is created
+# (or, if the Pokémon index was still loading then, when its draft starts)
+SPRITE_PREFETCH_LIMIT = 200
+
+
+@st.cache_resource
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for warming the sprite cache off the UI thread."""
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="sprites")
+
+
+def prefetch_sprites(names):
+    """
+    Queue a download for each name not already cached or queued (failed
+    ones after SPRITE_RETRY_SECONDS), and return immediately, so later
+    auction images are served from memory.
+    """
+    executor = get_prefetch_executor()
+    cache = get_sprite_bytes_cache()
+    session = get_http_session()
+    for name in names:
+        url = pokemon_image_url(name)
+        if cache.claim(url):
+            executor.submit(download_sprite, url, cache, session)
+
+
+def prefetch_popular_sprites():
+    """
+    Queue the first SPRITE_PREFETCH_LIMIT sprites; PokeAPI lists Pokémon
+    in National Dex order, so these are the most familiar ones. Does
+    nothing while the index is still loading, rather than waiting on it.
+    """
+    name_to_id = pokemon_index()[1]
+    prefetch_sprites(itertools.islice(name_to_id, SPRITE_PREFETCH_LIMIT))
+
+
+def sprite_source(name: str):
+    """
+    Image source for st.image: the sprite bytes once downloaded, else the
+    remote URL. A render never waits on the network; a missing sprite is
+    queued for the background pool instead.
+    """
+    url = pokemon_image_url(name)
+    data = get_sprite_bytes_cache().get(url)
+    if not data:
+        prefetch_sprites((name,))  # no-op if queued or failed recently
+    return data or url
+
+
+def available_pokemon(game_code: str, game: dict) -> list:
+    """
+    Undrafted names from the game's sorted pool, in order. The result is
+    kept per browser session and reused until the drafted mask changes,
+    so selectbox reruns skip the pool scan. The pool is frozen when the
+    draft starts (and the mask is sized to it), so the game code plus
+    the mask bytes identify the result.
+    """
+    mask = bytes(game["drafted_mask"])
+    client = client_state()
+    cached = client["available_cache"]
+    if cached is not None and cached[0] == game_code and cached[1] == mask:
+        return cached[2]
+
+    available = [m for m, drafted in zip(game["pool"], mask) if not drafted]
+    client["available_cache"] = (game_code, mask, available)
+    return available
 
 
 # ---------- Game helpers ----------
@@ -122,21 +557,41 @@ PLAYER_ICONS = [
     "🦁", "🐧", "🦈", "🦖", "🐸",
 ]
 
+# The log is capped so undo snapshots (which deep-copy it) stay small
+LOG_MAX_ENTRIES = 100
+LOG_DISPLAY_ENTRIES = 15
+
+# OS-backed RNG; choices() draws a whole code in one call
+CODE_RNG = secrets.SystemRandom()
+CODE_CHARS = string.ascii_uppercase + string.digits
+
 
 def generate_game_code(length: int = 6) -> str:
-    chars = string.ascii_uppercase + string.digits
+    """Unguessable code (CSPRNG) not already used by a stored game."""
     games = get_game_store()
     while True:
-        code = "".join(random.choice(chars) for _ in range(length))
+        code = "".join(CODE_RNG.choices(CODE_CHARS, k=length))
         if code not in games:
             return code
 
 
+# Undo depth. Every snapshot is pickled with the game on each load/save,
+# so an unbounded history would make every rerun and bid slower
+HISTORY_MAX_ENTRIES = 20
+
+# Budgets are stored as int32 per seat; keep well inside that range
+MAX_STARTING_BUDGET = 1_000_000
+
+
 def create_game(starting_budget: int, max_slots: int):
     """
     Create a new game in 'lobby' status.
     Players will join via lobby; host does NOT add player names.
     """
+    if not 0 < starting_budget <= MAX_STARTING_BUDGET:
+        raise ValueError(
+            f"starting_budget must be between 1 and {MAX_STARTING_BUDGET}"
+        )
     return {
         "status": "lobby",           # 'lobby' -> 'draft'
         "starting_budget": starting_budget,
@@ -146,17 +601,21 @@ def create_game(starting_budget: int, max_slots: int):
 
         "players": [],               # frozen at draft start
         "player_icons": {},          # name -> icon
-        "budgets": {},               # name -> $
-        "rosters": {},               # name -> list of mons
+        "player_index": {},          # name -> position in players
+        "budgets": np.zeros(0, dtype=np.int32),     # $ per seat
+        "slots_used": np.zeros(0, dtype=np.int32),  # roster size per seat
+        "rosters": [],               # (name, price) list per seat (by player_index)
 
         "current_nominator_index": 0,
         "current_pokemon": None,
         "current_bid": None,
         "current_bidder": None,
-        "log": [],
+        "log": deque(maxlen=LOG_MAX_ENTRIES),
         "draft_finished": False,
+        "pool": (),                  # sorted Pokémon names, frozen at draft start
+        "drafted_mask": bytearray(), # 1 per pool entry already on a roster
 
-        "history": [],               # for undo
+        "history": deque(maxlen=HISTORY_MAX_ENTRIES),  # for undo
     }
 
 
@@ -165,10 +624,10 @@ def push_history(game: dict):
     keys = [
         "status", "starting_budget", "max_slots",
         "lobby_players", "players", "player_icons",
-        "budgets", "rosters",
+        "player_index", "budgets", "slots_used", "rosters",
         "current_nominator_index",
         "current_pokemon", "current_bid", "current_bidder",
-        "log", "draft_finished",
+        "log", "draft_finished", "drafted_mask",
     ]
     snapshot = {k: copy.deepcopy(game.get(k)) for k in keys}
     game["history"].append(snapshot)
@@ -195,61 +654,240 @@ def start_draft(game) -> bool:
 
     push_history(game)
 
-    players = list(lobby_players.keys())
+    players = [*lobby_players]
     game["players"] = players
-    game["player_icons"] = dict(lobby_players)
-    game["budgets"] = {p: game["starting_budget"] for p in players}
-    game["rosters"] = {p: [] for p in players}
+    game["player_icons"] = {**lobby_players}
+    game["player_index"] = {p: i for i, p in enumerate(players)}
+    game["budgets"] = np.full(
+        len(players), game["starting_budget"], dtype=np.int32
+    )
+    game["slots_used"] = np.zeros(len(players), dtype=np.int32)
+    game["rosters"] = [[] for _ in players]
     game["current_nominator_index"] = 0
     game["current_pokemon"] = None
     game["current_bid"] = None
     game["current_bidder"] = None
-    game["log"] = []
+    game["log"] = deque(maxlen=LOG_MAX_ENTRIES)
     game["draft_finished"] = False
+    # Block here if the index is still loading: the pool is frozen per game
+    game["pool"] = pokemon_index(wait=True)[0]
+    game["drafted_mask"] = bytearray(len(game["pool"]))
     game["status"] = "draft"
     return True
 
 
+def mark_drafted(game, mon_name):
+    """Flag mon_name in drafted_mask; manual names outside the pool are ignored."""
+    pool = game["pool"]
+    i = bisect.bisect_left(pool, mon_name)
+    if i < len(pool) and pool[i] == mon_name:
+        game["drafted_mask"][i] = 1
+
+
+def nomination_mask(game) -> np.ndarray:
+    """Per seat: True while the player has a free slot and >= $50."""
+    return (game["slots_used"] < game["max_slots"]) & (game["budgets"] >= 50)
+
+
 def advance_nominator(game):
     """Advance nominator to next player who can still participate."""
-    players = game["players"]
+    eligible = np.flatnonzero(nomination_mask(game))  # sorted seat indices
+    if not len(eligible):
+        # No one can nominate anymore -> draft finished
+        game["draft_finished"] = True
+        return
+
+    # First eligible seat after the current one, wrapping to the lowest
+    pos = np.searchsorted(eligible, game["current_nominator_index"], side="right")
+    game["current_nominator_index"] = int(eligible[pos % len(eligible)])
+
+
+def everyone_full(game) -> bool:
+    return bool((game["slots_used"] >= game["max_slots"]).all())
+
+
+def save_game(game_code: str, game: dict) -> bool:
+    """
+    Write a mutated game back to the store. If someone else saved first,
+    warn and return False; the next rerun reloads their version.
+    """
+    if get_game_store().cas(game_code, game["seq"], game):
+        return True
+    st.warning("The game changed while you were acting. Please try again.")
+    return False
+
+
+# ---------- Status / export helpers ----------
+
+def export_snapshot(game: dict) -> tuple:
+    """
+    Hashable view of the exported draft state, used as a cache key:
+    one (player, icon, budget, ((name, price), ...)) entry per player.
+    """
+    return tuple(
+        (
+            p,
+            game["player_icons"].get(p, ""),
+            budget,
+            tuple(mons),
+        )
+        for p, budget, mons in zip(
+            game["players"], game["budgets"].tolist(), game["rosters"]
+        )
+    )
+
+
+def build_excel_rows(snapshot: tuple, max_slots: int) -> list:
+    """
+    Export sheet as plain rows: a header, then one row per player with
+    Player, Icon, RemainingBudget and a (Pokemon, Price) pair per slot.
+    Empty slots are written as "".
+    """
+    header = ["Player", "Icon", "RemainingBudget"]
+    for i in range(max_slots):
+        header += [f"Slot{i+1}_Pokemon", f"Slot{i+1}_Price"]
+
+    rows = [header]
+    for p, icon, budget, mons in snapshot:
+        row = [p, icon, budget]
+        for name, price in mons:
+            row += (name, price)
+        row += ["", ""] * (max_slots - len(mons))
+        rows.append(row)
+    return rows
+
+
+@st.cache_data(show_spinner=False)
+def build_excel_bytes(snapshot: tuple, max_slots: int) -> bytes:
+    """
+    Serialize the export sheet to .xlsx bytes with xlsxwriter directly
+    (constant_memory streams rows; no DataFrame in between).
+    Cached on the snapshot, so the workbook is only rebuilt when
+    rosters/budgets change.
+    """
+    header, *rows = build_excel_rows(snapshot, max_slots)
+
+    buffer = BytesIO()
+    # Names are user-typed: write them verbatim instead of scanning each
+    # one for URL or "=formula" syntax
+    workbook = xlsxwriter.Workbook(
+        buffer,
+        {
+            "constant_memory": True,
+            "strings_to_urls": False,
+            "strings_to_formulas": False,
+        },
+    )
+    sheet = workbook.add_worksheet("Draft")
+    # Same header look pandas' to_excel used
+    header_format = workbook.add_format(
+        {"bold": True, "border": 1, "align": "center", "valign": "top"}
+    )
+    sheet.write_row(0, 0, header, header_format)
+    for r, row in enumerate(rows, start=1):
+        sheet.write_row(r, 0, row)
+    workbook.close()
+    return buffer.getvalue()
+
+
+# ---------- Rendering helpers ----------
+
+# Backslash-escapes for Markdown metacharacters in user-typed names, so
+# "$..$" isn't LaTeX, "*"/"_"/"~" aren't emphasis, "[x](url)" isn't a
+# link, and "|" doesn't split a table row
+MARKDOWN_ESCAPES = str.maketrans({c: "\\" + c for c in "\\`*_~[]()$|#<>"})
+
+
+def status_table_markdown(game: dict) -> str:
+    """
+    Draft Status table as one Markdown string, so each rerun sends a
+    few lines of text instead of an Arrow-encoded DataFrame.
+    """
     max_slots = game["max_slots"]
-    budgets = game["budgets"]
-    rosters = game["rosters"]
+    lines = [
+        "| Player | Icon | Remaining \\$ | Slots used | Slots max |",
+        "|---|---|---:|---:|---:|",
+    ]
+    for p, budget, used in zip(
+        game["players"], game["budgets"].tolist(), game["slots_used"].tolist()
+    ):
+        name = p.translate(MARKDOWN_ESCAPES)
+        icon = game["player_icons"].get(p, "")
+        lines.append(f"| {name} | {icon} | {budget} | {used} | {max_slots} |")
+    return "\n".join(lines)
 
-    for _ in range(len(players)):
-        game["current_nominator_index"] = (
-            game["current_nominator_index"] + 1
-        ) % len(players)
-        p = players[game["current_nominator_index"]]
-        if len(rosters[p]) < max_slots and budgets[p] >= 50:
-            return
 
-    # If we get here, no one can nominate anymore -> draft finished
-    game["draft_finished"] = True
+def party_grid_html(mons: list, max_slots: int) -> str:
+    """
+    Render one player's party as a single HTML row of sprite cards
+    (sprite, name, price), padded with 'Empty' cells up to max_slots.
+    """
+    cells = []
+    for i in range(max_slots):
+        if i < len(mons):
+            mon_name, price = mons[i]
+            name = html.escape(mon_name)
+            cells.append(
+                '<div style="flex:1;text-align:center">'
+                f'<img src="{html.escape(pokemon_image_url(mon_name))}" '
+                f'width="80" alt="{name}">'
+                '<div style="font-size:0.8rem;opacity:0.7">'
+                # &#36; keeps markdown from reading "$..$" as LaTeX
+                f'{name}<br>&#36;{price}</div></div>'
+            )
+        else:
+            cells.append('<div style="flex:1;text-align:center">Empty</div>')
+    return f'<div style="display:flex;gap:8px">{"".join(cells)}</div>'
 
 
-def everyone_full(game) -> bool:
+def parties_html(game: dict) -> str:
+    """
+    Render every player's header line and party grid as one HTML block.
+    """
     max_slots = game["max_slots"]
-    rosters = game["rosters"]
-    return all(len(rosters[p]) >= max_slots for p in game["players"])
+    parts = []
+    for p, budget, mons in zip(
+        game["players"], game["budgets"].tolist(), game["rosters"]
+    ):
+        icon = game["player_icons"].get(p, "")
+        parts.append(
+            f"<h4>{icon} {html.escape(p)} – &#36;{budget} left "
+            f"({len(mons)}/{max_slots})</h4>"
+        )
+        if not mons:
+            parts.append("<p><em>No Pokémon yet.</em></p>")
+        else:
+            parts.append(party_grid_html(mons, max_slots))
+        parts.append("<hr>")
+    return "".join(parts)
 
 
 # ---------- Session-level state (per browser) ----------
 
-if "game_code" not in st.session_state:
-    st.session_state.game_code = None  # which game this user is attached to
-if "is_host" not in st.session_state:
-    st.session_state.is_host = False   # host or viewer
-if "player_name" not in st.session_state:
-    st.session_state.player_name = None
-if "player_icon" not in st.session_state:
-    st.session_state.player_icon = None
+def client_state() -> dict:
+    """
+    This browser's state as one dict in st.session_state, so reads are
+    plain dict lookups and leaving a game is a single pop("client").
+    """
+    return st.session_state.setdefault(
+        "client",
+        {
+            "game_code": None,        # which game this user is attached to
+            "is_host": False,         # host or viewer
+            "player_name": None,
+            "player_icon": None,
+            "available_cache": None,  # (game code, drafted mask, available)
+            "render_cache": None,     # ((game code, seq), status, export, parties)
+            "seen_seq": None,         # (game code, seq) last rendered here
+            "fragment_game": None,    # (game code, game) for the next panel run
+        },
+    )
 
 
 # ---------- UI: landing (Host / Join) ----------
 
 def show_landing_page():
+    client = client_state()
     st.title("Pokémon Auction Draft")
 
     st.markdown(
@@ -268,7 +906,11 @@ def show_landing_page():
             host_name = st.text_input("Host display name:", value="Host")
             host_icon = st.selectbox("Host icon:", PLAYER_ICONS, index=0)
             starting_budget = st.number_input(
-                "Starting budget", value=1000, min_value=100, step=50
+                "Starting budget",
+                value=1000,
+                min_value=100,
+                max_value=MAX_STARTING_BUDGET,
+                step=50,
             )
             max_slots = st.number_input(
                 "Max Pokémon per player",
@@ -287,16 +929,19 @@ def show_landing_page():
             hn = host_name.strip()
             if hn:
                 game["lobby_players"][hn] = host_icon
-                st.session_state.player_name = hn
-                st.session_state.player_icon = host_icon
+                client["player_name"] = hn
+                client["player_icon"] = host_icon
             else:
-                st.session_state.player_name = None
-                st.session_state.player_icon = None
+                client["player_name"] = None
+                client["player_icon"] = None
+
+            games.put(code, game)
 
-            games[code] = game
+            # Warm sprites while the lobby fills
+            prefetch_popular_sprites()
 
-            st.session_state.game_code = code
-            st.session_state.is_host = True
+            client["game_code"] = code
+            client["is_host"] = True
 
             st.success(f"Game created! Code: **{code}**")
             st.info("Share this code with players so they can join the lobby.")
@@ -317,19 +962,17 @@ def show_landing_page():
                 st.error("Enter a game code.")
                 return
 
-            games = get_game_store()
-            if join_code not in games:
+            game = get_game_store().get(join_code)
+            if game is None:
                 st.error("No game found with that code. Check the code and try again.")
                 return
 
-            game = games[join_code]
-
             # If draft already started, join as viewer (no lobby registration)
             if game["status"] != "lobby":
-                st.session_state.game_code = join_code
-                st.session_state.is_host = False
-                st.session_state.player_name = None
-                st.session_state.player_icon = None
+                client["game_code"] = join_code
+                client["is_host"] = False
+                client["player_name"] = None
+                client["player_icon"] = None
                 st.success(f"Joined game **{join_code}** as viewer.")
                 st.rerun()
                 return
@@ -345,10 +988,12 @@ def show_landing_page():
                 return
 
             game["lobby_players"][pn] = icon
-            st.session_state.game_code = join_code
-            st.session_state.is_host = False
-            st.session_state.player_name = pn
-            st.session_state.player_icon = icon
+            if not save_game(join_code, game):
+                return
+            client["game_code"] = join_code
+            client["is_host"] = False
+            client["player_name"] = pn
+            client["player_icon"] = icon
 
             st.success(f"Joined lobby for **{join_code}** as {icon} **{pn}**.")
             st.rerun()
@@ -357,6 +1002,7 @@ def show_landing_page():
 # ---------- UI: Lobby ----------
 
 def show_lobby_view(game_code: str, is_host: bool, game: dict):
+    client = client_state()
     st.subheader("Lobby")
 
     st.write(
@@ -371,17 +1017,15 @@ def show_lobby_view(game_code: str, is_host: bool, game: dict):
     else:
         st.markdown("### Players in Lobby")
         # Show in a grid
-        names = list(lobby_players.keys())
-        icons = [lobby_players[n] for n in names]
         cols = st.columns(4)
-        for idx, (n, icon) in enumerate(zip(names, icons)):
+        for idx, (n, icon) in enumerate(lobby_players.items()):
             with cols[idx % 4]:
                 st.markdown(f"{icon} **{n}**")
 
     # Info for this client
-    if not is_host and st.session_state.player_name:
+    if not is_host and client["player_name"]:
         st.info(
-            f"You are {st.session_state.player_icon} **{st.session_state.player_name}** "
+            f"You are {client['player_icon']} **{client['player_name']}** "
             f"in this lobby. Waiting for host to start the draft."
         )
     elif not is_host:
@@ -395,278 +1039,318 @@ def show_lobby_view(game_code: str, is_host: bool, game: dict):
             ok = start_draft(game)
             if not ok:
                 st.error("You need at least 2 players in the lobby to start.")
-            else:
+            elif save_game(game_code, game):
+                # Covers games created while the index was still loading;
+                # start_draft waited for it, and queued sprites are skipped
+                prefetch_popular_sprites()
                 st.success("Draft started!")
                 st.rerun()
 
 
 # ---------- UI: Draft ----------
 
-def show_draft_view(game_code: str, is_host: bool, game: dict):
+@st.fragment
+def show_bidding_panel(game_code: str, is_host: bool):
+    """
+    Nomination, bidding and log. Runs as a fragment, so widget changes in
+    here (e.g. picking a bid amount) rerun only this panel, not the export
+    builder or the parties grid. Mutations call st.rerun(), which still
+    refreshes the whole page.
+    The game isn't a parameter, because fragment reruns reuse the
+    arguments of the last full run: full runs hand over the game the page
+    already loaded via client["fragment_game"], fragment reruns reload it.
+    """
+    client = client_state()
+    handed_over = client["fragment_game"]
+    client["fragment_game"] = None
+    if handed_over is not None and handed_over[0] == game_code:
+        game = handed_over[1]
+    else:
+        game = get_game_store().get(game_code)
+    if game is None:
+        return
+
+    # A click is only honoured if nobody saved the game after this browser
+    # last rendered it, i.e. the user acted on what is now on screen.
+    seen_seq = client["seen_seq"]
+    client["seen_seq"] = (game_code, game["seq"])
+    stale_click = seen_seq != client["seen_seq"]
+    stale_message = (
+        "The draft changed before your click arrived. Check it and try again."
+    )
+    # Set when a click mutated game but save_game rejected it
+    unsaved = False
+
     players = game["players"]
+    player_index = game["player_index"]
     budgets = game["budgets"]
+    slots_used = game["slots_used"]
     rosters = game["rosters"]
     max_slots = game["max_slots"]
     player_icons = game["player_icons"]
+    log = game["log"]
 
-    current_user = st.session_state.player_name
-    is_player = current_user in players
+    current_user = client["player_name"]
+    is_player = current_user in player_index
 
-    # ---------- Top: status + export ----------
+    st.subheader("Nomination & Bidding")
 
-    st.subheader("Draft Status")
+    if game["draft_finished"] or everyone_full(game):
+        st.success("Draft finished! Everyone is full or cannot nominate anymore.")
+    else:
+        current_nominator = players[game["current_nominator_index"]]
+        current_nominator_icon = player_icons.get(current_nominator, "")
 
-    col_summary, col_excel = st.columns([3, 1])
+        # NOMINATION STAGE
+        if game["current_pokemon"] is None:
+            st.markdown(
+                f"**Current nominator:** "
+                f"{current_nominator_icon} **{current_nominator}**"
+            )
 
-    with col_summary:
-        df_status = pd.DataFrame(
-            {
-                "Player": players,
-                "Icon": [player_icons.get(p, "") for p in players],
-                "Remaining $": [budgets[p] for p in players],
-                "Slots used": [len(rosters[p]) for p in players],
-                "Slots max": [max_slots] * len(players),
-            }
-        )
-        st.dataframe(
-            df_status,
-            hide_index=True,
-            width="stretch",
-        )
+            # Only the current nominator OR the host can nominate
+            can_nominate = (
+                (is_player and current_user == current_nominator) or is_host
+            )
 
-    with col_excel:
-        st.markdown("### Export")
+            if not can_nominate:
+                st.info(
+                    "Waiting for the current nominator to choose a Pokémon."
+                )
+            else:
+                # Nomination with autocomplete from full Pokémon pool
+                if game["pool"]:
+                    available_mons = available_pokemon(game_code, game)
 
-        def build_excel_data(game_obj):
-            rows = []
-            for p in game_obj["players"]:
-                row = {
-                    "Player": p,
-                    "Icon": game_obj["player_icons"].get(p, ""),
-                    "RemainingBudget": game_obj["budgets"][p],
-                }
-                max_slots_local = game_obj["max_slots"]
-                for i in range(max_slots_local):
-                    if i < len(game_obj["rosters"][p]):
-                        mon = game_obj["rosters"][p][i]
-                        row[f"Slot{i+1}_Pokemon"] = mon["name"]
-                        row[f"Slot{i+1}_Price"] = mon["price"]
+                    if not available_mons:
+                        st.info("All Pokémon in the pool have been drafted.")
+                        nominated_mon = ""
                     else:
-                        row[f"Slot{i+1}_Pokemon"] = ""
-                        row[f"Slot{i+1}_Price"] = ""
-                rows.append(row)
-            return pd.DataFrame(rows)
-
-        excel_df = build_excel_data(game)
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-            excel_df.to_excel(writer, index=False, sheet_name="Draft")
-        buffer.seek(0)
-
-        st.download_button(
-            label="Download Excel",
-            data=buffer,
-            file_name=f"draft_results_{game_code}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
+                        nominated_mon = st.selectbox(
+                            "Nominate a Pokémon (type to search):",
+                            options=available_mons,
+                            key="nominate_select",
+                        )
+                else:
+                    nominated_mon = st.text_input(
+                        "Nominate a Pokémon (text, e.g. 'landorus-therian', 'archaludon'):",
+                        key="nominate_input",
+                    )
 
-    st.markdown("---")
+                if st.button("Nominate", type="primary", key="nominate_btn"):
+                    mon_name = nominated_mon.strip() if nominated_mon else ""
+                    if stale_click:
+                        st.warning(stale_message)
+                    elif not mon_name:
+                        st.error(
+                            "Select or enter a Pokémon name before nominating."
+                        )
+                    else:
+                        push_history(game)
+                        game["current_pokemon"] = mon_name
+                        opening_bid = 50
+                        game["current_bid"] = opening_bid
+                        game["current_bidder"] = current_nominator
+                        log.append(
+                            f"{current_nominator_icon} {current_nominator} "
+                            f"nominated {mon_name} with opening bid ${opening_bid}."
+                        )
+                        if save_game(game_code, game):
+                            st.rerun()
+                        unsaved = True
 
-    col_left, col_right = st.columns([2, 3])
+        # BIDDING STAGE
+        else:
+            mon_name = game["current_pokemon"]
+            current_bid = game["current_bid"]
+            current_bidder = game["current_bidder"]
+            current_bidder_icon = player_icons.get(current_bidder, "")
 
-    # ---------- Left: Nomination & Bidding ----------
-    with col_left:
-        st.subheader("Nomination & Bidding")
+            st.markdown(f"### Auction: **{mon_name}**")
+            st.markdown(
+                f"Current bid: **${current_bid}** by "
+                f"{current_bidder_icon} **{current_bidder}**"
+            )
 
-        if game["draft_finished"] or everyone_full(game):
-            st.success("Draft finished! Everyone is full or cannot nominate anymore.")
-        else:
-            current_nominator = players[game["current_nominator_index"]]
-            current_nominator_icon = player_icons.get(current_nominator, "")
-
-            # NOMINATION STAGE
-            if game["current_pokemon"] is None:
-                st.markdown(
-                    f"**Current nominator:** "
-                    f"{current_nominator_icon} **{current_nominator}**"
-                )
+            # Cached bytes are served from Streamlit's media store under a
+            # stable URL; until then (or if the download failed) the
+            # browser loads the remote URL itself.
+            st.image(sprite_source(mon_name), width=128, caption=mon_name)
 
-                # Only the current nominator OR the host can nominate
-                can_nominate = (
-                    (is_player and current_user == current_nominator) or is_host
-                )
+            min_bid = current_bid + 25
 
-                if not can_nominate:
+            # This client bidding as THEMSELVES
+            if is_player:
+                max_allowed = int(budgets[player_index[current_user]])
+                if max_allowed < min_bid:
                     st.info(
-                        "Waiting for the current nominator to choose a Pokémon."
+                        f"You ({player_icons.get(current_user, '')} "
+                        f"{current_user}) don't have enough to outbid "
+                        f"(needs at least ${min_bid}, you have ${max_allowed})."
                     )
                 else:
-                    # Nomination with autocomplete from full Pokémon pool
-                    if POKEMON_POOL:
-                        drafted_mons = {
-                            mon["name"]
-                            for mons in rosters.values()
-                            for mon in mons
-                        }
-                        available_mons = [
-                            m for m in POKEMON_POOL if m not in drafted_mons
-                        ]
-
-                        if not available_mons:
-                            st.info("All Pokémon in the pool have been drafted.")
-                            nominated_mon = ""
-                        else:
-                            nominated_mon = st.selectbox(
-                                "Nominate a Pokémon (type to search):",
-                                options=sorted(available_mons),
-                                key="nominate_select",
-                            )
-                    else:
-                        nominated_mon = st.text_input(
-                            "Nominate a Pokémon (text, e.g. 'landorus-therian', 'archaludon'):",
-                            key="nominate_input",
-                        )
-
-                    if st.button("Nominate", type="primary", key="nominate_btn"):
-                        mon_name = nominated_mon.strip() if nominated_mon else ""
-                        if not mon_name:
+                    # A stepper only ships min/max/step to the browser, not
+                    # every allowed amount. Bounds are part of the key so the
+                    # widget resets to the new minimum after each outbid.
+                    new_bid = st.number_input(
+                        "Your bid (increments of $25)",
+                        min_value=min_bid,
+                        max_value=max_allowed,
+                        value=min_bid,
+                        step=25,
+                        key=f"bid_amount_self_{min_bid}_{max_allowed}",
+                    )
+                    if st.button(
+                        f"Place bid as {current_user}",
+                        key="bid_button_self",
+                    ):
+                        if stale_click:
+                            st.warning(stale_message)
+                        elif not min_bid <= new_bid <= max_allowed:
+                            # number_input doesn't clamp submitted values
                             st.error(
-                                "Select or enter a Pokémon name before nominating."
+                                f"Bids must be between ${min_bid} and "
+                                f"${max_allowed}."
                             )
+                        elif (new_bid - min_bid) % 25:
+                            st.error("Bids must go up in increments of $25.")
                         else:
                             push_history(game)
-                            game["current_pokemon"] = mon_name
-                            opening_bid = 50
-                            game["current_bid"] = opening_bid
-                            game["current_bidder"] = current_nominator
-                            game["log"].append(
-                                f"{current_nominator_icon} {current_nominator} "
-                                f"nominated {mon_name} with opening bid ${opening_bid}."
+                            game["current_bid"] = int(new_bid)
+                            game["current_bidder"] = current_user
+                            log.append(
+                                f"{player_icons.get(current_user, '')} "
+                                f"{current_user} bids ${new_bid} on {mon_name}."
                             )
-                            st.rerun()
-
-            # BIDDING STAGE
+                            if save_game(game_code, game):
+                                st.rerun()
+                            unsaved = True
             else:
-                mon_name = game["current_pokemon"]
-                current_bid = game["current_bid"]
-                current_bidder = game["current_bidder"]
-                current_bidder_icon = player_icons.get(current_bidder, "")
-
-                st.markdown(f"### Auction: **{mon_name}**")
-                st.markdown(
-                    f"Current bid: **${current_bid}** by "
-                    f"{current_bidder_icon} **{current_bidder}**"
-                )
-
-                st.image(
-                    pokemon_image_url(mon_name),
-                    width=128,
-                    caption=mon_name,
-                )
-
-                min_bid = current_bid + 25
-
-                # This client bidding as THEMSELVES
-                if is_player:
-                    max_allowed = budgets[current_user]
-                    if max_allowed < min_bid:
-                        st.info(
-                            f"You ({player_icons.get(current_user, '')} "
-                            f"{current_user}) don't have enough to outbid "
-                            f"(needs at least ${min_bid}, you have ${max_allowed})."
+                st.info("You are a viewer only for this auction.")
+
+            # Host-only: close bidding & assign
+            if is_host:
+                if st.button("Close bidding & assign Pokémon", type="primary"):
+                    winner = current_bidder
+                    winner_idx = player_index[winner]
+                    price = current_bid
+                    winner_icon = player_icons.get(winner, "")
+
+                    if stale_click:
+                        st.warning(stale_message)
+                    elif budgets[winner_idx] < price:
+                        st.error(
+                            "Error: winner does not have enough budget "
+                            "(something went wrong)."
                         )
+                    elif slots_used[winner_idx] >= max_slots:
+                        st.error("Error: winner already has a full team.")
                     else:
-                        allowed_bids = list(range(min_bid, max_allowed + 1, 25))
-                        new_bid = st.selectbox(
-                            f"Your bid (increments of $25)",
-                            options=allowed_bids,
-                            key="bid_amount_self",
+                        push_history(game)
+                        budgets[winner_idx] -= price
+                        rosters[winner_idx].append((mon_name, price))
+                        slots_used[winner_idx] += 1
+                        mark_drafted(game, mon_name)
+                        log.append(
+                            f"{mon_name} goes to {winner_icon} {winner} "
+                            f"for ${price}."
                         )
-                        if st.button(
-                            f"Place bid as {current_user}",
-                            key="bid_button_self",
-                        ):
-                            push_history(game)
-                            game["current_bid"] = int(new_bid)
-                            game["current_bidder"] = current_user
-                            game["log"].append(
-                                f"{player_icons.get(current_user, '')} {current_user} "
-                                f"bids ${new_bid} on {mon_name}."
-                            )
+                        game["current_pokemon"] = None
+                        game["current_bid"] = None
+                        game["current_bidder"] = None
+
+                        # Also finishes the draft once everyone is full,
+                        # since full seats drop out of the nomination mask
+                        advance_nominator(game)
+
+                        if save_game(game_code, game):
                             st.rerun()
-                else:
-                    st.info("You are a viewer only for this auction.")
+                        unsaved = True
 
-                # Host-only: close bidding & assign
-                if is_host:
-                    if st.button("Close bidding & assign Pokémon", type="primary"):
-                        winner = game["current_bidder"]
-                        price = game["current_bid"]
-                        winner_icon = player_icons.get(winner, "")
+    if unsaved:
+        # Show the log as stored, not with the rejected entry appended
+        stored = get_game_store().get(game_code)
+        log = stored["log"] if stored is not None else ()
 
-                        if budgets[winner] < price:
-                            st.error(
-                                "Error: winner does not have enough budget "
-                                "(something went wrong)."
-                            )
-                        elif len(rosters[winner]) >= max_slots:
-                            st.error("Error: winner already has a full team.")
-                        else:
-                            push_history(game)
-                            budgets[winner] -= price
-                            rosters[winner].append(
-                                {"name": mon_name, "price": price}
-                            )
-                            game["log"].append(
-                                f"{mon_name} goes to {winner_icon} {winner} "
-                                f"for ${price}."
-                            )
-                            game["current_pokemon"] = None
-                            game["current_bid"] = None
-                            game["current_bidder"] = None
+    st.markdown("### Log")
+    recent = itertools.islice(reversed(log), LOG_DISPLAY_ENTRIES)
+    # Single markdown element; "$" escaped so prices aren't read as LaTeX
+    st.markdown("\n".join("- " + e.replace("$", "\\$") for e in recent))
 
-                            if everyone_full(game):
-                                game["draft_finished"] = True
-                            else:
-                                advance_nominator(game)
 
-                            st.rerun()
+def show_draft_view(game_code: str, is_host: bool, game: dict):
+    max_slots = game["max_slots"]
+
+    # Streamlit must re-send every element on each rerun, but the status
+    # table, export snapshot and parties HTML are only rebuilt when the
+    # stored game has changed (seq moved on).
+    client = client_state()
+    fingerprint = (game_code, game["seq"])
+    cached = client["render_cache"]
+    if cached is None or cached[0] != fingerprint:
+        cached = client["render_cache"] = (
+            fingerprint,
+            status_table_markdown(game),
+            export_snapshot(game),
+            parties_html(game),
+        )
+    _, status_md, snapshot, parties = cached
 
-        st.markdown("### Log")
-        for entry in reversed(game["log"][-15:]):
-            st.write("- " + entry)
+    # ---------- Top: status + export ----------
+
+    st.subheader("Draft Status")
+
+    col_summary, col_excel = st.columns([3, 1])
+
+    with col_summary:
+        st.markdown(status_md)
+
+    with col_excel:
+        st.markdown("### Export")
+
+        # The workbook is only serialized when the button is clicked;
+        # the snapshot is the one rendered, so the file matches the screen.
+        st.download_button(
+            label="Download Excel",
+            data=lambda: build_excel_bytes(snapshot, max_slots),
+            file_name=f"draft_results_{game_code}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+    st.markdown("---")
+
+    col_left, col_right = st.columns([2, 3])
+
+    # ---------- Left: Nomination & Bidding ----------
+    with col_left:
+        client["fragment_game"] = (game_code, game)
+        show_bidding_panel(game_code, is_host)
 
     # ---------- Right: Parties ----------
     with col_right:
         st.subheader("Current Parties")
 
-        for p in players:
-            icon = player_icons.get(p, "")
-            st.markdown(
-                f"#### {icon} {p} – ${budgets[p]} left "
-                f"({len(rosters[p])}/{max_slots})"
-            )
-            mons = rosters[p]
-            if not mons:
-                st.write("_No Pokémon yet._")
-            else:
-                cols = st.columns(max_slots)
-                for i in range(max_slots):
-                    with cols[i]:
-                        if i < len(mons):
-                            mon = mons[i]
-                            st.image(
-                                pokemon_image_url(mon["name"]),
-                                width=80,
-                            )
-                            st.caption(f"{mon['name']}\n${mon['price']}")
-                        else:
-                            st.write("Empty")
-            st.markdown("---")
+        # One markdown element for all parties instead of widgets per slot
+        st.markdown(parties, unsafe_allow_html=True)
 
 
 # ---------- UI: single game wrapper ----------
 
+# How often open game pages check for changes made by others
+GAME_POLL_SECONDS = 2
+
+
+@st.fragment(run_every=GAME_POLL_SECONDS)
+def watch_game(game_code: str, rendered_seq: int):
+    """
+    Poll the store for this game's seq and rerun the whole page only once
+    someone has saved a change, so idle ticks cost one indexed lookup
+    instead of a full script run.
+    """
+    if get_game_store().seq(game_code) != rendered_seq:
+        st.rerun()
+
+
 def show_game_page(game_code: str, is_host: bool):
     games = get_game_store()
     game = games.get(game_code)
@@ -677,36 +1361,39 @@ def show_game_page(game_code: str, is_host: bool):
 
     if game is None:
         st.error(
-            "This game no longer exists (server may have restarted or code is invalid)."
+            "This game no longer exists (the code may be invalid)."
         )
         if st.button("Back to Home"):
-            st.session_state.game_code = None
-            st.session_state.is_host = False
-            st.session_state.player_name = None
-            st.session_state.player_icon = None
+            st.session_state.pop("client", None)
             st.rerun()
         return
 
     cols_top = st.columns([1, 1, 3])
     with cols_top[0]:
         if st.button("Leave Game"):
-            st.session_state.game_code = None
-            st.session_state.is_host = False
-            st.session_state.player_name = None
-            st.session_state.player_icon = None
+            st.session_state.pop("client", None)
             st.rerun()
 
     with cols_top[1]:
         if is_host:
+            # No st.rerun() needed: the lobby/draft view below is rendered
+            # after this, in the same pass, from the reverted state.
             if st.button("Undo last action"):
                 if not undo_last_action(game):
                     st.warning("Nothing to undo.")
-                else:
+                elif save_game(game_code, game):
                     st.success("Reverted last action.")
-                st.rerun()
+                else:
+                    # The revert wasn't stored; render what actually is
+                    game = games.get(game_code)
+                    if game is None:
+                        st.rerun()
 
     st.markdown("---")
 
+    # Undo above may have saved, so pass the seq this page renders
+    watch_game(game_code, game["seq"])
+
     if game["status"] == "lobby":
         show_lobby_view(game_code, is_host, game)
     else:
@@ -715,8 +1402,9 @@ def show_game_page(game_code: str, is_host: bool):
 
 # ---------- Main app routing ----------
 
-if st.session_state.game_code is None:
+client = client_state()
+if client["game_code"] is None:
     show_landing_page()
 else:
-    show_game_page(st.session_state.game_code, st.session_state.is_host)
+    show_game_page(client["game_code"], client["is_host"])
 